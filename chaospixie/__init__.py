@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
+import functools
+import json
 import os
+import re
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Tuple
 
+import numpy as np
 import pxapi
 from chaoslib.discovery.discover import (
     discover_probes,
@@ -19,8 +26,33 @@ from chaoslib.types import (
 )
 from logzero import logger
 
+try:
+    # orjson serializes datetime, UUID and numpy values natively in C,
+    # which makes the per-cell encode() pass unnecessary. Entirely
+    # optional, we fallback to the stdlib silently.
+    import orjson
+except ImportError:
+    orjson = None
+
 __version__ = "0.1.1"
-__all__ = ["connect", "discover", "execute_script"]
+_PX_DISPLAY_RGX = re.compile(r"px\.display\(\s*(\w+)")
+
+_CONN_CACHE: Dict[Tuple[str, str, str], pxapi.Conn] = {}
+_CONN_LOCK = threading.Lock()
+
+_SCRIPT_CACHE: Dict[Tuple[str, int, int], str] = {}
+__all__ = [
+    "close_all",
+    "connect",
+    "discover",
+    "execute_script",
+    "execute_script_columns",
+    "execute_script_iter",
+    "build_px_filter",
+    "make_row_class",
+    "dumps",
+    "rows_from_columns",
+]
 
 
 def connect(configuration: Configuration, secrets: Secrets) -> pxapi.Conn:
@@ -31,40 +63,273 @@ def connect(configuration: Configuration, secrets: Secrets) -> pxapi.Conn:
     * secret key `api_key` or the `PIXIE_API_KEY` env var
     * configuration key `px_server_url` or the `PIXIE_SERVER_URL` env var,
       which uses the default Pixie saas server endpoint
+
+    Connections are cached per cluster/key/server so an experiment with
+    many probes against the same cluster only pays the TLS and gRPC
+    stream setup once. Call `close_all` to drop them.
     """
     auth = get_auth(configuration, secrets)
-
-    px_client = pxapi.Client(
-        token=auth["px_key"],
-        server_url=auth["px_server_url"],
-        use_encryption=False,
-    )
-    conn = px_client.connect_to_cluster(auth["px_cluster_id"])
+    key = (auth["px_cluster_id"], auth["px_key"], auth["px_server_url"])
+
+    with _CONN_LOCK:
+        conn = _CONN_CACHE.get(key)
+        if conn is None:
+            px_client = pxapi.Client(
+                token=auth["px_key"],
+                server_url=auth["px_server_url"],
+                use_encryption=False,
+            )
+            conn = px_client.connect_to_cluster(auth["px_cluster_id"])
+            _CONN_CACHE[key] = conn
 
     return conn
 
 
+def close_all() -> None:
+    """
+    Drop all cached cluster connections. The next call to `connect` will
+    establish fresh ones.
+    """
+    with _CONN_LOCK:
+        _CONN_CACHE.clear()
+
+
 def execute_script(
-    conn: pxapi.Conn, script: str, table_name: str
+    conn: pxapi.Conn, script: str, table_name: str, compact: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Executes the script synchronously and read the given table for rows of
     results.
+
+    Set `compact` to get slotted row objects instead of dictionaries,
+    which cuts the per-row memory overhead on very large tables. They
+    still support the `row[column]` and `column in row` idioms, and
+    expose `as_dict()` when a plain dictionary is required.
+
+    Rows are serialized on a small thread pool so the CPU-bound encoding
+    overlaps with the network-bound result iteration; `map` preserves
+    the row order. Use `execute_script_iter` to stream instead.
     """
     logger.debug(f"Running Pixie script:\n{script}")
 
     s = conn.prepare_script(script)
-    r = []
-    for idx, e in enumerate(s.results(table_name)):
-        e = serialize_row(e)
-        handle_timestamp(e)
-        r.append(e)
+    results = iter(s.results(table_name))
+
+    first = next(results, None)
+    if first is None:
+        r = []
+    else:
+        rel = first.relation
+        names = [rel.get_col_name(i) for i in range(len(first._data))]
+        process = _row_processor(names, compact)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            r = list(pool.map(process, chain([first], results)))
 
     logger.debug(f"Pixie script returned: {r}")
 
     return r
 
 
+def execute_script_iter(
+    conn: pxapi.Conn, script: str, table_name: str, compact: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Executes the script synchronously and yield the rows of the given
+    table one by one, as they are streamed from the cluster.
+
+    Unlike `execute_script`, this never materializes the full result set,
+    so memory stays constant however many rows the table carries and
+    consumers can start working while rows are still being received.
+    """
+    logger.debug(f"Running Pixie script:\n{script}")
+
+    s = conn.prepare_script(script)
+    process = None
+    for row in s.results(table_name):
+        if process is None:
+            rel = row.relation
+            names = [rel.get_col_name(i) for i in range(len(row._data))]
+            process = _row_processor(names, compact)
+
+        yield process(row)
+
+
+def execute_script_columns(
+    conn: pxapi.Conn, script: str, table_name: str
+) -> Dict[str, List[Any]]:
+    """
+    Executes the script synchronously and read the given table into a
+    columnar mapping of column name to the list of its values.
+
+    This trades the dict-per-row layout of `execute_script` for a single
+    dict shared by all rows, which allocates far less and lets the
+    timestamp conversion run as one vectorized operation. Use
+    `rows_from_columns` to get the row-oriented view back when needed.
+    """
+    logger.debug(f"Running Pixie script:\n{script}")
+
+    s = conn.prepare_script(script)
+
+    names = None
+    columns = []
+    for row in s.results(table_name):
+        if names is None:
+            rel = row.relation
+            names = [rel.get_col_name(i) for i in range(len(row._data))]
+            columns = [[] for _ in names]
+
+        for i, c in enumerate(row._data):
+            columns[i].append(encode(c))
+
+    if names is None:
+        return {}
+
+    cols = dict(zip(names, columns))
+
+    for time_col in ("time_", "create_time", "start_time"):
+        if time_col in cols:
+            cols["_dt"] = nanotime_array_to_iso(cols[time_col]).tolist()
+            break
+
+    logger.debug(f"Pixie script returned columns: {list(cols)}")
+
+    return cols
+
+
+def build_px_filter(
+    script: str, column: str = None, target: Tuple[str, str] = None
+) -> str:
+    """
+    Rewrite the script so filtering happens inside the cluster rather
+    than client-side.
+
+    When `target` is given as a `(key, pattern)` tuple, only the rows
+    whose `key` matches the pattern are displayed; when `column` is
+    given, only that column is kept. Both drastically reduce the amount
+    of data transferred and serialized for selective tolerances.
+
+    The script is returned untouched when it contains no `px.display`
+    call or when there is nothing to filter on.
+    """
+    if not (column or target):
+        return script
+
+    m = None
+    for m in _PX_DISPLAY_RGX.finditer(script):
+        pass
+
+    if m is None:
+        return script
+
+    df = m.group(1)
+
+    lines = []
+    if target:
+        key, pattern = target
+        lines.append(f"{df} = {df}[px.regex_match('{pattern}', {df}.{key})]")
+    if column:
+        lines.append(f"{df} = {df}[['{column}']]")
+
+    start = script.rfind("\n", 0, m.start()) + 1
+    injected = "".join(f"{line}\n" for line in lines)
+
+    return script[:start] + injected + script[start:]
+
+
+def dumps(results: Any) -> bytes:
+    """
+    Serialize script results to JSON bytes.
+
+    When orjson is installed, datetime, UUID and numpy values are
+    serialized directly in C so results from `serialize_row_raw` can be
+    dumped without the per-cell `encode` pass. Otherwise the stdlib
+    encoder is used with `encode` as the fallback handler.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            results, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(results, default=_json_default).encode("utf-8")
+
+
+class _CompactRowBase:
+    """
+    Dict-compatible row backed by `__slots__` rather than a per-row
+    dictionary. Subclasses, built by `make_row_class`, define one slot
+    per column.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        try:
+            setattr(self, name, value)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return hasattr(self, name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if hasattr(self, name)
+        }
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+
+def make_row_class(names: List[str]) -> type:
+    """
+    Build a compact row class with one slot per column, plus the derived
+    `_dt` timestamp. Slotted rows carry none of the dict per-instance
+    overhead, which noticeably lowers peak memory on large result sets.
+    """
+    slots = tuple(names)
+    if "_dt" not in slots:
+        slots += ("_dt",)
+    return type("PixieRow", (_CompactRowBase,), {"__slots__": slots})
+
+
+def _json_default(o: object) -> Any:
+    """
+    `json.dumps` hook delegating to `encode`. A default hook must return
+    a serializable object or raise; passing the value through unchanged
+    would surface as a bogus circular-reference error instead.
+    """
+    encoded = encode(o)
+    if encoded is o:
+        raise TypeError(
+            f"Object of type {type(o).__name__} is not JSON serializable"
+        )
+    return encoded
+
+
+def rows_from_columns(cols: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Convert a columnar result, as returned by `execute_script_columns`,
+    back into the list of rows `execute_script` would have returned.
+    """
+    names = list(cols)
+    return [dict(zip(names, values)) for values in zip(*cols.values())]
+
+
 def discover(discover_system: bool = True) -> Discovery:  # pragma: no cover
     """
     Discover Kubernetes capabilities offered by this extension.
@@ -89,12 +354,36 @@ def load_exported_activities() -> List[
     """
     activities = []
     activities.extend(discover_probes("chaospixie.probes"))
+    return activities
 
 
 def get_auth(configuration: Configuration, secrets: Secrets) -> Dict[str, str]:
+    """
+    Resolve the Pixie credentials from the configuration, secrets and
+    environment.
+
+    Experiments pass the same configuration and secrets to every probe,
+    so the resolution is memoized on their content and only runs once.
+    """
     configuration = configuration or {}
     secrets = secrets or {}
 
+    try:
+        return _build_auth(
+            frozenset(configuration.items()), frozenset(secrets.items())
+        )
+    except TypeError:
+        # the configuration carries unhashable values, skip the cache
+        return _build_auth.__wrapped__(
+            tuple(configuration.items()), tuple(secrets.items())
+        )
+
+
+@functools.lru_cache(maxsize=16)
+def _build_auth(configuration, secrets) -> Dict[str, str]:
+    configuration = dict(configuration)
+    secrets = dict(secrets)
+
     px_cluster_id = os.getenv(
         "PIXIE_CLUSTER_ID", configuration.get("pixie_cluster_id")
     )
@@ -128,22 +417,90 @@ def get_auth(configuration: Configuration, secrets: Secrets) -> Dict[str, str]:
 def load_script_from_file(script_path: str) -> str:
     """
     Read the Pixie script from the given local file.
+
+    The content is cached against the file's modification time and size
+    so hypotheses running the same script repeatedly do not re-read and
+    re-decode it on every probe call. Editing the file invalidates the
+    cache automatically.
     """
     p = Path(script_path)
     if not p.exists():
         raise ActivityFailed(f"'{script_path} is not a valid path")
 
-    return p.read_text("utf-8")
+    st = p.stat()
+    key = (str(p.resolve()), st.st_mtime_ns, st.st_size)
+
+    script = _SCRIPT_CACHE.get(key)
+    if script is None:
+        script = _SCRIPT_CACHE[key] = p.read_text("utf-8")
 
+    return script
 
-def serialize_row(row: pxapi.data.Row) -> Dict[str, Any]:
+
+def _row_processor(names: List[str], compact: bool = False):
+    """
+    Build the per-row serialization function for a table with the given
+    column names: the time column and, for compact rows, the row class
+    are resolved once here rather than per row.
+    """
+    time_col = _find_time_column(names)
+    row_cls = make_row_class(names) if compact else None
+
+    def process(row: pxapi.data.Row) -> Dict[str, Any]:
+        if compact:
+            e = row_cls(map(encode, row._data))
+        else:
+            e = serialize_row(row, names)
+
+        if time_col:
+            e["_dt"] = encode(nanotime_to_datetime(e[time_col]))
+        return e
+
+    return process
+
+
+def _find_time_column(names: List[str]) -> str:
+    """
+    Return the name of the timestamp column carried by the table, if
+    any. All rows share the same schema so this only needs resolving
+    once, not through per-row membership checks.
+    """
+    for c in ("time_", "create_time", "start_time"):
+        if c in names:
+            return c
+    return None
+
+
+def serialize_row(
+    row: pxapi.data.Row, names: List[str] = None
+) -> Dict[str, Any]:
     """
     Serialize a Pixie row into a dictionary of native types.
+
+    All rows of a table share the same column names, so callers
+    serializing many rows should resolve `names` once and pass them in
+    rather than paying a `get_col_name` call per cell.
+    """
+    if names is None:
+        rel = row.relation
+        names = [rel.get_col_name(i) for i in range(len(row._data))]
+    return dict(zip(names, map(encode, row._data)))
+
+
+def serialize_row_raw(
+    row: pxapi.data.Row, names: List[str] = None
+) -> Dict[str, Any]:
+    """
+    Serialize a Pixie row into a dictionary, keeping datetime and UUID
+    values intact rather than encoding them to strings.
+
+    Use this with `dumps` so orjson can serialize those types natively
+    without a Python-side pass over every cell.
     """
-    out = {}
-    for i, c in enumerate(row._data):
-        out[row.relation.get_col_name(i)] = encode(c)
-    return out
+    if names is None:
+        rel = row.relation
+        names = [rel.get_col_name(i) for i in range(len(row._data))]
+    return dict(zip(names, row._data))
 
 
 def handle_timestamp(r: pxapi.data.Row) -> None:
@@ -161,6 +518,27 @@ def handle_timestamp(r: pxapi.data.Row) -> None:
         r["_dt"] = encode(nanotime_to_datetime(r["start_time"]))
 
 
+def nanotime_array_to_iso(nanos: np.ndarray) -> np.ndarray:
+    """
+    Convert an array of timestamps in nanoseconds to ISO-8601 UTC strings
+    in a single vectorized pass, down to the microseconds only.
+
+    This is the batch equivalent of `nanotime_to_datetime`, without the
+    per-row datetime/timedelta allocations.
+    """
+    nanos = np.asarray(nanos, dtype=np.int64)
+    # round to the nearest microsecond like nanotime_to_datetime does,
+    # rather than truncating
+    dt = ((nanos + 500) // 1000).astype("timedelta64[us]") + np.datetime64(
+        "1970-01-01T00:00:00", "us"
+    )
+    iso = dt.astype(str)
+    # datetime.isoformat() omits the microseconds when they are zero,
+    # keep both representations identical
+    iso = np.char.replace(iso, ".000000", "")
+    return np.char.add(iso, "+00:00")
+
+
 def nanotime_to_datetime(nano: int) -> datetime:
     """
     Convert a timestamp in nanoseconds to a Python UTC datetime object,
@@ -172,12 +550,37 @@ def nanotime_to_datetime(nano: int) -> datetime:
     )
 
 
+# exact-type dispatch for encode(): a None entry means the value passes
+# through untouched. A single dict lookup on type() is cheaper than the
+# isinstance checks when encoding every cell of a large table.
+_ENCODERS = {
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    uuid.UUID: str,
+    bool: None,
+    int: None,
+    float: None,
+    str: None,
+    bytes: None,
+    type(None): None,
+}
+
+
 def encode(o: object) -> Any:
     """
     The results will be serialized to json by Chaos Toolkit, so let's ensure
     some of the types don't break this process by encoding to native types
     ourselves.
     """
+    fn = _ENCODERS.get(type(o), _encode_slow)
+    return o if fn is None else fn(o)
+
+
+def _encode_slow(o: object) -> Any:
+    """
+    Fallback for types not in the dispatch table, notably subclasses of
+    the handled types.
+    """
     if isinstance(o, (date, datetime)):
         return o.isoformat()
     elif isinstance(o, uuid.UUID):
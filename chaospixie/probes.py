@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from chaoslib.types import Configuration, Secrets
 
-from chaospixie import connect, execute_script, load_script_from_file
+from chaospixie import (
+    build_px_filter,
+    connect,
+    execute_script,
+    load_script_from_file,
+)
 
-__all__ = ["run_script", "run_script_from_local_file"]
+__all__ = ["run_script", "run_scripts", "run_script_from_local_file"]
 
 
 def run_script(
@@ -13,28 +18,57 @@ def run_script(
     table_name: str = "output",
     configuration: Configuration = None,
     secrets: Secrets = None,
+    column: str = None,
+    target: Tuple[str, str] = None,
 ) -> str:
     """
     Run a Pixie script.
 
     Make sure to provide the name of the table you want to fetch data for.
     Usually it's the name given to the `px.display()` function in your script.
+
+    When `column` and/or `target` are set, the script is rewritten so the
+    filtering runs in the cluster itself and only the matching rows, and
+    that single column, come back over the wire. See `build_px_filter`.
     """
+    script = build_px_filter(script, column, target)
     c = connect(configuration, secrets)
     return execute_script(c, script, table_name)
 
 
+def run_scripts(
+    scripts: List[Tuple[str, str]],
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run several Pixie scripts over a single cluster connection.
+
+    Each entry of `scripts` is a `(script, table_name)` tuple, see
+    `run_script`. Results are returned in the same order. Connecting
+    once for the whole batch avoids paying the connection setup for
+    every script the way back-to-back `run_script` probes would.
+    """
+    c = connect(configuration, secrets)
+    return [execute_script(c, s, t) for s, t in scripts]
+
+
 def run_script_from_local_file(
     script_path: str,
     table_name: str = "output",
     configuration: Configuration = None,
     secrets: Secrets = None,
+    column: str = None,
+    target: Tuple[str, str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Run a Pixie script loaded from a local file.
 
     Make sure to provide the name of the table you want to fetch data for.
     Usually it's the name given to the `px.display()` function in your script.
+
+    When `column` and/or `target` are set, the script is rewritten so the
+    filtering runs in the cluster itself. See `build_px_filter`.
     """
     s = load_script_from_file(script_path)
-    return run_script(s, table_name, configuration, secrets)
+    return run_script(s, table_name, configuration, secrets, column, target)
@@ -10,12 +10,19 @@ import pytest
 from chaoslib.exceptions import ActivityFailed, InvalidExperiment
 
 from chaospixie import (
+    build_px_filter,
+    dumps,
     encode,
     execute_script,
+    execute_script_columns,
+    execute_script_iter,
     get_auth,
     handle_timestamp,
     load_script_from_file,
+    make_row_class,
+    nanotime_array_to_iso,
     nanotime_to_datetime,
+    rows_from_columns,
     serialize_row,
 )
 
@@ -137,6 +144,37 @@ def test_nanotime_to_datetime():
     nanotime_to_datetime(n) == d
 
 
+@patch("chaospixie.pxapi.Client", autospec=True)
+def test_execute_script_columns(client: MagicMock):
+    c = MagicMock()
+    s = MagicMock()
+    c.prepare_script.return_value = s
+
+    r = MagicMock()
+    r.columns = [
+        MagicMock(column_name="cola", column_type=2),
+        MagicMock(column_name="colb", column_type=2),
+        MagicMock(column_name="time_", column_type=6),
+    ]
+
+    tableA = pxapi.data._TableStream(
+        "a", relation=pxapi.data._Relation(r), subscribed=False
+    )
+    row = pxapi.data.Row(tableA, [1, 2, int(time() * 1e9)])
+
+    s.results.return_value = [row]
+
+    cols = execute_script_columns(c, PXL_SCRIPT, "http_table")
+    assert cols["cola"] == [1]
+    assert cols["colb"] == [2]
+    assert "_dt" in cols
+
+    rows = rows_from_columns(cols)
+    assert len(rows) == 1
+    assert rows[0]["cola"] == 1
+    assert "_dt" in rows[0]
+
+
 @patch("chaospixie.pxapi.Client", autospec=True)
 def test_execute_script(client: MagicMock):
     c = MagicMock()
@@ -158,3 +196,119 @@ def test_execute_script(client: MagicMock):
     s.results.return_value = [row]
 
     execute_script(c, PXL_SCRIPT, "http_table")
+
+
+def test_nanotime_array_to_iso():
+    n = 1661870000123456000
+    iso = nanotime_array_to_iso([n])
+    assert iso[0] == nanotime_to_datetime(n).isoformat()
+
+
+def test_dumps_handles_datetime_and_uuid():
+    u = uuid.uuid4()
+    d = datetime.utcnow()
+    out = dumps([{"id": u, "at": d}])
+    assert str(u).encode("utf-8") in out
+
+
+def test_build_px_filter():
+    s = build_px_filter(PXL_SCRIPT, "latency", ("req_path", "/consumer.*"))
+    assert "df = df[px.regex_match('/consumer.*', df.req_path)]" in s
+    assert "df = df[['latency']]" in s
+    assert s.index("px.regex_match") < s.index("px.display")
+
+
+def test_build_px_filter_without_filter_is_noop():
+    assert build_px_filter(PXL_SCRIPT) == PXL_SCRIPT
+
+
+@patch("chaospixie.pxapi.Client", autospec=True)
+def test_execute_script_compact_rows(client: MagicMock):
+    c = MagicMock()
+    s = MagicMock()
+    c.prepare_script.return_value = s
+
+    r = MagicMock()
+    r.columns = [
+        MagicMock(column_name="cola", column_type=2),
+        MagicMock(column_name="colb", column_type=2),
+        MagicMock(column_name="time_", column_type=6),
+    ]
+
+    tableA = pxapi.data._TableStream(
+        "a", relation=pxapi.data._Relation(r), subscribed=False
+    )
+    row = pxapi.data.Row(tableA, [1, 2, int(time() * 1e9)])
+
+    s.results.return_value = [row]
+
+    rows = execute_script(c, PXL_SCRIPT, "http_table", compact=True)
+    assert len(rows) == 1
+    assert rows[0]["cola"] == 1
+    assert "cola" in rows[0]
+    assert "_dt" in rows[0]
+    assert rows[0].as_dict()["colb"] == 2
+
+
+def test_make_row_class():
+    cls = make_row_class(["cola", "colb"])
+    row = cls([1, 2])
+    assert row["cola"] == 1
+    assert row.get("missing") is None
+    assert "colb" in row
+    with pytest.raises(KeyError):
+        row["nope"]
+
+
+@patch("chaospixie.pxapi.Client", autospec=True)
+def test_execute_script_iter(client: MagicMock):
+    c = MagicMock()
+    s = MagicMock()
+    c.prepare_script.return_value = s
+
+    r = MagicMock()
+    r.columns = [
+        MagicMock(column_name="cola", column_type=2),
+        MagicMock(column_name="colb", column_type=2),
+        MagicMock(column_name="time_", column_type=6),
+    ]
+
+    tableA = pxapi.data._TableStream(
+        "a", relation=pxapi.data._Relation(r), subscribed=False
+    )
+    row = pxapi.data.Row(tableA, [1, 2, int(time() * 1e9)])
+
+    s.results.return_value = [row, row]
+
+    rows = list(execute_script_iter(c, PXL_SCRIPT, "http_table"))
+    assert len(rows) == 2
+    assert rows[0]["cola"] == 1
+    assert rows[0]["colb"] == 2
+    assert "_dt" in rows[0]
+    assert "_dt" in rows[1]
+
+
+def test_nanotime_array_to_iso_whole_seconds():
+    n = 1661870000000000000
+    iso = nanotime_array_to_iso([n])
+    assert iso[0] == nanotime_to_datetime(n).isoformat()
+
+
+def test_nanotime_array_to_iso_rounds_up():
+    n = 1661870000999999999
+    iso = nanotime_array_to_iso([n])
+    assert iso[0] == nanotime_to_datetime(n).isoformat()
+
+
+@patch("chaospixie.orjson", None)
+def test_dumps_stdlib_fallback_handles_datetime_and_uuid():
+    u = uuid.uuid4()
+    d = datetime.utcnow()
+    out = dumps([{"id": u, "at": d}])
+    assert str(u).encode("utf-8") in out
+
+
+@patch("chaospixie.orjson", None)
+def test_dumps_stdlib_fallback_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps([{"payload": {1, 2}}])
@@ -2,7 +2,14 @@
 from tempfile import NamedTemporaryFile
 from unittest.mock import MagicMock, patch
 
-from chaospixie.probes import run_script, run_script_from_local_file
+import pytest
+
+from chaospixie import close_all
+from chaospixie.probes import (
+    run_script,
+    run_script_from_local_file,
+    run_scripts,
+)
 
 PXL_SCRIPT = """
 import px
@@ -12,6 +19,13 @@ px.display(df, 'http_table')
 """
 
 
+@pytest.fixture(autouse=True)
+def fresh_connections():
+    close_all()
+    yield
+    close_all()
+
+
 @patch("chaospixie.pxapi.Client", autospec=True)
 def test_run_script(client: MagicMock):
     c = {"pixie_cluster_id": "cluster"}
@@ -27,3 +41,23 @@ def test_run_script_from_file(client: MagicMock):
         f.write(PXL_SCRIPT.encode("utf-8"))
         f.seek(0)
         assert run_script_from_local_file(f.name, "http_table", c, s) == []
+
+
+@patch("chaospixie.pxapi.Client", autospec=True)
+def test_run_script_reuses_connection(client: MagicMock):
+    c = {"pixie_cluster_id": "cluster"}
+    s = {"api_key": "secret"}
+    run_script(PXL_SCRIPT, "http_table", c, s)
+    run_script(PXL_SCRIPT, "http_table", c, s)
+    assert client.call_count == 1
+
+
+@patch("chaospixie.pxapi.Client", autospec=True)
+def test_run_scripts(client: MagicMock):
+    c = {"pixie_cluster_id": "cluster"}
+    s = {"api_key": "secret"}
+    results = run_scripts(
+        [(PXL_SCRIPT, "http_table"), (PXL_SCRIPT, "other_table")], c, s
+    )
+    assert results == [[], []]
+    assert client.call_count == 1
@@ -99,25 +99,66 @@ def test_group_values_with_target():
         {"something": 0.8, "pod": "/consumer/2"},
         {"latency": 0.9, "pod": "/producer/3"},
     ]
-    assert group_values(values, "latency", ("pod", "/consumer.*")) == [0.5, 0.8]
+    assert group_values(values, "latency", ("pod", "/consumer.*")).tolist() == [
+        0.5,
+        0.8,
+    ]
 
 
 def test_group_values_convert_to_seconds():
     values = [
         {"latency": 5 * 1e9, "pod": "/consumer/1"},
     ]
-    assert group_values(values, "latency", None, "seconds") == [5]
+    assert group_values(values, "latency", None, "seconds").tolist() == [5]
 
 
 def test_group_values_convert_to_milliseconds():
     values = [
         {"latency": 5 * 1e9, "pod": "/consumer/1"},
     ]
-    assert group_values(values, "latency", None, "milliseconds") == [5 * 1e3]
+    assert group_values(values, "latency", None, "milliseconds").tolist() == [
+        5 * 1e3
+    ]
 
 
 def test_group_values_convert_to_microseconds():
     values = [
         {"latency": 5 * 1e9, "pod": "/consumer/1"},
     ]
-    assert group_values(values, "latency", None, "microseconds") == [5 * 1e6]
+    assert group_values(values, "latency", None, "microseconds").tolist() == [
+        5 * 1e6
+    ]
+
+
+def test_percentile_should_be_below_approximate():
+    assert (
+        percentile_should_be_below(
+            "latency",
+            1.0,
+            99,
+            value=[{"latency": v / 1000.0} for v in range(1000)],
+            approximate=True,
+        )
+        is True
+    )
+
+
+def test_group_values_with_non_prefix_target():
+    values = [
+        {"latency": 0.5, "pod": "/consumer/1"},
+        {"latency": 0.8, "pod": "/consumer/2"},
+        {"latency": 0.9, "pod": "/producer/3"},
+    ]
+    assert group_values(
+        values, "latency", ("pod", "/(consumer|producer)/2")
+    ).tolist() == [0.8]
+
+
+def test_group_values_with_target_as_list():
+    values = [
+        {"latency": 0.5, "pod": "/consumer/1"},
+        {"latency": 0.9, "pod": "/producer/3"},
+    ]
+    assert group_values(values, "latency", ["pod", "/consumer.*"]).tolist() == [
+        0.5
+    ]